@@ -0,0 +1,26 @@
+# add_indexes.py
+from app import app, db
+from models import User, Product, Order
+
+# The indexes this script adds, by name. Listed explicitly rather than taking every
+# index on the models: checkfirst only matches names, so an index duplicating a
+# unique constraint's own index would be created alongside it on existing databases.
+INDEXES = {
+    User: ('ix_user_created_at', 'ix_user_is_admin_created_at'),
+    Product: ('ix_product_stock', 'ix_product_created_at', 'ix_product_category_id'),
+    Order: ('ix_order_order_date', 'ix_order_status_order_date', 'ix_order_user_id_order_date'),
+}
+
+def add_indexes():
+    """Create the model indexes on an existing database (create_all skips existing tables)"""
+    with app.app_context():
+        for model, names in INDEXES.items():
+            indexes = {index.name: index for index in model.__table__.indexes}
+            for name in names:
+                indexes[name].create(bind=db.engine, checkfirst=True)
+                print(f"✓ {name}")
+        
+        print("✓ Indexes added successfully")
+
+if __name__ == '__main__':
+    add_indexes()
@@ -5,23 +5,25 @@ from dotenv import load_dotenv
 # Load environment variables FIRST - before anything else
 load_dotenv()
 
-# Optional: Print to verify loading (remove in production)
-print("=== ENVIRONMENT VARIABLES AFTER LOAD ===")
-print(f"MAIL_SERVER: {os.environ.get('MAIL_SERVER', 'NOT SET')}")
-print(f"MAIL_USERNAME: {os.environ.get('MAIL_USERNAME', 'NOT SET')}")
-print(f"ADMIN_EMAIL: {os.environ.get('ADMIN_EMAIL', 'NOT SET')}")
-print("========================================")
-
 # Now your other imports
 import traceback
 import logging
+import queue
+import atexit
+from logging.handlers import QueueHandler, QueueListener
+import mimetypes
+import stat
 import time
 from collections import defaultdict
 from flask import Flask, render_template, redirect, url_for, flash, request, abort, send_from_directory, send_file, session, g, make_response
+from jinja2 import FileSystemBytecodeCache
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.utils import safe_join
 from datetime import datetime, timedelta
-from sqlalchemy import text
+from sqlalchemy import text, select, insert, update, func, case, and_, true
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import load_only, selectinload, joinedload
 
 # Try to import extensions
 try:
@@ -31,7 +33,7 @@ except ImportError:
     sys.exit(1)
 
 from config import Config
-from models import db, User, Product, Order, OrderItem, OrderTracking, Settings, NIGERIA_STATES, PasswordResetToken, MaintenanceSettings
+from models import db, User, Product, Order, OrderItem, OrderTracking, Settings, NIGERIA_STATES, NIGERIA_STATES_SET, PasswordResetToken, MaintenanceSettings
 from forms import LoginForm, SignupForm, ProductForm
 from utils import save_picture
 from cart import Cart
@@ -40,6 +42,27 @@ from email_utils import send_order_notifications, send_order_status_update, send
 # Initialize Flask app
 app = Flask(__name__)
 app.config.from_object(Config)
+# Debug endpoints return large dicts; skip sorting their keys on every response
+app.json.sort_keys = False
+
+# Debug and test endpoints are left out of the URL map unless explicitly enabled
+DEBUG_ROUTES_ENABLED = app.debug or app.config.get('ENABLE_DEBUG_ROUTES') or __name__ == '__main__'
+
+def debug_route(rule, **options):
+    """app.route for debug/test endpoints; a no-op when debug routes are disabled"""
+    def decorator(f):
+        if DEBUG_ROUTES_ENABLED:
+            return app.route(rule, **options)(f)
+        return f
+    return decorator
+
+# Share compiled templates between workers and across restarts. With no directory
+# argument Jinja uses a per-user temp directory it creates with mode 0700 and refuses
+# if it is owned by someone else, so other local users can't plant bytecode there.
+try:
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
+except (OSError, RuntimeError) as e:
+    print(f"⚠ Jinja bytecode cache disabled: {e}")
 
 # Initialize Flask-Limiter
 try:
@@ -62,18 +85,37 @@ except ImportError:
             return decorator
     limiter = DummyLimiter()
 
-# Setup logging
-logging.basicConfig(level=logging.DEBUG, stream=sys.stdout)
+# Setup logging (INFO by default; set LOG_LEVEL=DEBUG for verbose output).
+# On long-running servers records go through a queue so a background thread does
+# the stdout writes. Vercel freezes the process between invocations, which could
+# strand queued records, so there the handler writes directly.
+log_level = os.environ.get('LOG_LEVEL', 'INFO').upper()
+if app.config.get('IS_VERCEL'):
+    logging.basicConfig(level=log_level, stream=sys.stdout)
+else:
+    _log_queue = queue.SimpleQueue()
+    _log_listener = {'listener': None}
+    logging.basicConfig(level=log_level, handlers=[QueueHandler(_log_queue)])
+
+    def _start_log_listener():
+        """Start the thread that writes queued log records for the current process"""
+        listener = QueueListener(_log_queue, logging.StreamHandler(sys.stdout))
+        listener.start()
+        _log_listener['listener'] = listener
+
+    def _stop_log_listener():
+        """Flush the queue on shutdown"""
+        if _log_listener['listener'] is not None:
+            _log_listener['listener'].stop()
+
+    # Threads don't survive fork, so workers forked from a preloaded app (gunicorn
+    # --preload) would queue records nothing ever writes. Each child starts its own.
+    _start_log_listener()
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_start_log_listener)
+    atexit.register(_stop_log_listener)
 logger = logging.getLogger(__name__)
 
-# Print environment variables for debugging (remove in production)
-print("=== ENVIRONMENT VARIABLES DEBUG ===")
-print(f"DATABASE_URL: {'Set' if os.environ.get('DATABASE_URL') else 'NOT SET'}")
-print(f"POSTGRES_URL: {'Set' if os.environ.get('POSTGRES_URL') else 'NOT SET'}")
-print(f"POSTGRES_PRISMA_URL: {'Set' if os.environ.get('POSTGRES_PRISMA_URL') else 'NOT SET'}")
-print(f"VERCEL_ENV: {os.environ.get('VERCEL_ENV', 'not set')}")
-print("===================================")
-
 # Simple in-memory rate limiter (use Redis in production)
 reset_requests = defaultdict(list)
 
@@ -99,52 +141,47 @@ def check_rate_limit(email, max_requests=3, time_window=3600):
         seconds = wait_time % 60
         return False, f"Too many reset attempts. Please wait {minutes} minute(s) and {seconds} second(s)."
 
+# Written once the directories below exist, so warm serverless instances skip the checks.
+# Only used on Vercel, where /tmp belongs to this one deployment; on a shared machine a
+# marker left by another checkout or user would wrongly skip creating our directories.
+_DIRS_READY_MARKER = '/tmp/.captain_dirs_ready'
+
 # Function to ensure directories exist with proper permissions
 def ensure_directories():
     """Create all necessary directories if they don't exist"""
     project_root = os.path.dirname(os.path.abspath(__file__))
+    use_marker = app.config.get('IS_VERCEL')
+    if use_marker and os.path.exists(_DIRS_READY_MARKER):
+        return project_root
     user_home = os.path.expanduser("~")
     
-    directories = [
-        os.path.join(project_root, 'static'),
-        os.path.join(project_root, 'static', 'css'),
-        os.path.join(project_root, 'static', 'js'),
-        os.path.join(project_root, 'static', 'images'),
-        os.path.join(project_root, 'static', 'images', 'products'),
-        os.path.join(project_root, 'templates'),
-        os.path.join(project_root, 'templates', 'dashboard'),
-        os.path.join(project_root, 'templates', 'admin'),
-        os.path.join(project_root, 'instance'),
-        os.path.join(user_home, 'captain_signature_uploads'),
-        os.path.join(user_home, 'captain_signature_uploads', 'product_images'),
-        '/tmp/captain_signature_uploads/products',
-        '/tmp/captain_signature_uploads',
-        '/tmp'
-    ]
-    
-    print("=" * 50)
-    print("Checking and creating directories...")
+    # Leaf directories only; makedirs creates their parents on the way
+    if app.config.get('IS_VERCEL'):
+        # Only /tmp is writable on Vercel; the deployment bundle already has the rest
+        directories = ['/tmp/captain_signature_uploads/products']
+    else:
+        directories = [
+            os.path.join(project_root, 'static', 'css'),
+            os.path.join(project_root, 'static', 'js'),
+            os.path.join(project_root, 'static', 'images', 'products'),
+            os.path.join(project_root, 'templates', 'dashboard'),
+            os.path.join(project_root, 'templates', 'admin'),
+            os.path.join(project_root, 'instance'),
+            os.path.join(user_home, 'captain_signature_uploads', 'product_images'),
+            '/tmp/captain_signature_uploads/products'
+        ]
     
     for directory in directories:
         try:
-            if not os.path.exists(directory):
-                os.makedirs(directory, mode=0o777, exist_ok=True)
-                print(f"✓ Created: {directory}")
-            else:
-                print(f"✓ Exists: {directory}")
-                os.chmod(directory, 0o777)
-                
-            if directory.startswith('/tmp'):
-                if os.path.exists(directory):
-                    print(f"  Writable: {os.access(directory, os.W_OK)}")
-                    print(f"  Readable: {os.access(directory, os.R_OK)}")
-            elif not os.access(directory, os.W_OK):
-                print(f"⚠ Warning: Directory not writable: {directory}")
-                
-        except Exception as e:
-            print(f"✗ Error creating {directory}: {e}")
+            os.makedirs(directory, mode=0o777, exist_ok=True)
+        except OSError as e:
+            logger.warning("Error creating %s: %s", directory, e)
     
-    print("=" * 50)
+    if use_marker:
+        try:
+            open(_DIRS_READY_MARKER, 'w').close()
+        except OSError:
+            pass
     return project_root
 
 # Call the function to create directories
@@ -152,6 +189,10 @@ project_root = ensure_directories()
 user_home = os.path.expanduser("~")
 upload_folder = os.path.join(user_home, 'captain_signature_uploads', 'product_images')
 
+# Upload locations resolved once at import instead of on every image request
+USER_UPLOAD_DIR = upload_folder
+TMP_UPLOAD_DIR = '/tmp/captain_signature_uploads/products'
+
 # Initialize extensions
 db.init_app(app)
 login_manager = LoginManager(app)
@@ -160,13 +201,23 @@ login_manager.login_message_category = 'info'
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # Remember the user for the rest of the request in case the loader runs again
+    uid = int(user_id)
+    cached = g.get('_user_cache')
+    if cached and cached[0] == uid:
+        return cached[1]
+    user = db.session.get(User, uid)
+    g._user_cache = (uid, user)
+    return user
 
 # Helper function to get maintenance settings
 def get_maintenance_settings():
-    """Get maintenance settings from database"""
+    """Get maintenance settings from database, once per request"""
+    if 'maintenance' in g:
+        return g.maintenance
     try:
-        return MaintenanceSettings.get_settings()
+        g.maintenance = MaintenanceSettings.get_cached()
+        return g.maintenance
     except Exception as e:
         print(f"Error getting maintenance settings: {e}")
         # Return a dummy object if database fails
@@ -224,24 +275,38 @@ def check_maintenance_mode():
                              message=maintenance.message,
                              estimated_return=maintenance.estimated_return), 503
 
+def current_cart():
+    """The request's Cart, built (and its session data validated) once per request"""
+    if 'cart' not in g:
+        g.cart = Cart()
+    return g.cart
+
+# Endpoints that never render the site layout, so they skip the template context below
+SKIP_CONTEXT_ENDPOINTS = {'static', 'tmp_uploads', 'user_uploads', 'health_check'}
+
 # Make session, cart, and settings available to all templates
 @app.before_request
 def before_request():
     """Make cart and settings available to all templates"""
-    if 'cart' not in session:
-        session['cart'] = {}
+    endpoint = request.endpoint
+    if endpoint in SKIP_CONTEXT_ENDPOINTS or (endpoint and endpoint.startswith('debug_')):
+        return
     
+    # Cart keeps session['cart_count'] up to date whenever it changes, so the badge
+    # is a plain lookup. Sessions from before the counter existed fall back to
+    # counting once. Nothing is written here, so anonymous visitors get no cookie.
     try:
-        cart = Cart()
-        g.cart_count = cart.get_total_items()
+        g.cart_count = session.get('cart_count')
+        if g.cart_count is None:
+            g.cart_count = current_cart().get_total_items() if 'cart' in session else 0
     except Exception as e:
-        print(f"Error getting cart count: {e}")
+        logger.warning("Error getting cart count: %s", e)
         g.cart_count = 0
     
     try:
-        g.settings = Settings.get_settings()
+        g.settings = Settings.get_cached()
     except Exception as e:
-        print(f"Error getting settings: {e}")
+        logger.warning("Error getting settings: %s", e)
         from types import SimpleNamespace
         g.settings = SimpleNamespace(
             delivery_fee=1500.00,
@@ -252,7 +317,8 @@ def before_request():
     
     # Make maintenance config available to all templates for admin panel
     try:
-        maintenance = MaintenanceSettings.get_settings()
+        # Already loaded by check_maintenance_mode for this request
+        maintenance = get_maintenance_settings()
         g.maintenance_config = {
             'enabled': maintenance.enabled,
             'message': maintenance.message,
@@ -261,7 +327,7 @@ def before_request():
             'allowed_paths': maintenance.get_allowed_paths_list()
         }
     except Exception as e:
-        print(f"Error getting maintenance settings for template: {e}")
+        logger.warning("Error getting maintenance settings for template: %s", e)
         g.maintenance_config = {
             'enabled': False,
             'message': 'Under Maintenance',
@@ -270,77 +336,88 @@ def before_request():
             'allowed_paths': ['/static', '/admin/maintenance']
         }
 
-# Create tables and admin user - ROBUST VERSION
-with app.app_context():
-    try:
-        db.create_all()
-        print("✓ Database tables created/verified")
-        
-        # Create default maintenance settings if none exist
-        try:
-            maintenance = MaintenanceSettings.query.first()
-            if not maintenance:
-                maintenance = MaintenanceSettings()
-                db.session.add(maintenance)
-                db.session.commit()
-                print("✓ Default maintenance settings created")
-        except Exception as e:
-            print(f"⚠ Could not create maintenance settings: {e}")
-            db.session.rollback()
-        
+# Create tables, the admin user and default settings. This runs several queries, so
+# it is not done on every cold start: run `flask --app app init-db` once per database,
+# or set RUN_DB_INIT=1 to do it at import (python app.py always does it).
+def init_db():
+    with app.app_context():
         try:
-            admin_exists = User.query.filter_by(email='admin@captainsignature.com').first()
-        except Exception as e:
-            print(f"⚠ Could not query users table: {e}")
-            admin_exists = None
-        
-        if not admin_exists:
+            db.create_all()
+            print("✓ Database tables created/verified")
+            
+            # Create default maintenance settings if none exist
             try:
-                admin = User(
-                    username='admin',
-                    email='admin@captainsignature.com',
-                    password=generate_password_hash('admin123'),
-                    is_admin=True
-                )
-                db.session.add(admin)
-                db.session.commit()
-                
-                print("✓ Admin user created successfully!")
+                maintenance = MaintenanceSettings.query.first()
+                if not maintenance:
+                    maintenance = MaintenanceSettings()
+                    db.session.add(maintenance)
+                    db.session.commit()
+                    print("✓ Default maintenance settings created")
             except Exception as e:
-                print(f"⚠ Could not create admin user: {e}")
+                print(f"⚠ Could not create maintenance settings: {e}")
                 db.session.rollback()
-        
-        try:
-            settings = Settings.query.first()
-        except Exception as e:
-            print(f"⚠ Could not query settings table: {e}")
-            settings = None
-        
-        if not settings:
+            
             try:
-                settings = Settings(
-                    delivery_fee=1500.00,
-                    free_delivery_threshold=0,
-                    currency='₦',
-                    site_name='Captain Signature'
-                )
-                db.session.add(settings)
-                db.session.commit()
-                print("✓ Default settings created successfully!")
+                admin_exists = User.query.filter_by(email='admin@captainsignature.com').first()
             except Exception as e:
-                print(f"⚠ Could not create settings: {e}")
-                db.session.rollback()
+                print(f"⚠ Could not query users table: {e}")
+                admin_exists = None
             
-    except Exception as e:
-        print(f"✗ Database initialization error: {e}")
-        print(traceback.format_exc())
-        print("⚠ Continuing startup despite database errors - app may have limited functionality")
+            if not admin_exists:
+                try:
+                    admin = User(
+                        username='admin',
+                        email='admin@captainsignature.com',
+                        password=generate_password_hash('admin123', method=app.config['PASSWORD_HASH_METHOD']),
+                        is_admin=True
+                    )
+                    db.session.add(admin)
+                    db.session.commit()
+                    
+                    print("✓ Admin user created successfully!")
+                except Exception as e:
+                    print(f"⚠ Could not create admin user: {e}")
+                    db.session.rollback()
+            
+            try:
+                settings = Settings.query.first()
+            except Exception as e:
+                print(f"⚠ Could not query settings table: {e}")
+                settings = None
+            
+            if not settings:
+                try:
+                    settings = Settings(
+                        delivery_fee=1500.00,
+                        free_delivery_threshold=0,
+                        currency='₦',
+                        site_name='Captain Signature'
+                    )
+                    db.session.add(settings)
+                    db.session.commit()
+                    print("✓ Default settings created successfully!")
+                except Exception as e:
+                    print(f"⚠ Could not create settings: {e}")
+                    db.session.rollback()
+                
+        except Exception as e:
+            print(f"✗ Database initialization error: {e}")
+            print(traceback.format_exc())
+            print("⚠ Continuing startup despite database errors - app may have limited functionality")
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create the database tables and seed the admin user and default settings"""
+    init_db()
+
+if os.environ.get('RUN_DB_INIT') == '1':
+    init_db()
 
 # Remove the old maintenance config import and instance
 # from maintenance_config import MaintenanceConfig  <- REMOVE THIS
 # maintenance = MaintenanceConfig()  <- REMOVE THIS
 
-@app.route('/test-email-simple')
+@debug_route('/test-email-simple')
 def test_email_simple():
     """Ultra-simple email test"""
     import smtplib
@@ -379,7 +456,7 @@ def test_email_simple():
     
     return "<pre>" + "\n".join(results) + "</pre>"
 
-@app.route('/test-email-direct')
+@debug_route('/test-email-direct')
 def test_email_direct():
     """Ultra simple email test - no spaces in password"""
     import smtplib
@@ -420,12 +497,24 @@ def test_email_direct():
     
     return "<pre>" + "\n".join(results) + "</pre>"
 
+# Static part of the health payload - the environment doesn't change while the process runs
+_HEALTH_ENVIRONMENT = {
+    'DATABASE_URL': 'set' if os.environ.get('DATABASE_URL') else 'not set',
+    'VERCEL_ENV': os.environ.get('VERCEL_ENV', 'not set'),
+}
+_health_timestamp = {'second': None, 'iso': ''}
+
+def _cached_iso():
+    """Current time as an ISO string, rebuilt at most once per second"""
+    second = int(time.time())
+    if _health_timestamp['second'] != second:
+        _health_timestamp['iso'] = datetime.fromtimestamp(second).isoformat()
+        _health_timestamp['second'] = second
+    return _health_timestamp['iso']
+
 @app.route('/api/health')
 def health_check():
     """Health check endpoint for Vercel"""
-    import platform
-    import sys
-    
     db_status = "unknown"
     try:
         db.session.execute(text('SELECT 1')).scalar()
@@ -435,50 +524,64 @@ def health_check():
     
     return {
         'status': 'running',
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': _cached_iso(),
         'database': db_status,
-        'environment': {
-            'DATABASE_URL': 'set' if os.environ.get('DATABASE_URL') else 'not set',
-            'VERCEL_ENV': os.environ.get('VERCEL_ENV', 'not set'),
-        }
+        'environment': _HEALTH_ENVIRONMENT
     }
 
+def accel_redirect(directory, internal_prefix, filename):
+    """Empty response telling nginx to stream directory/filename from its internal location"""
+    if safe_join(directory, filename) is None:
+        abort(404)
+    response = make_response('')
+    response.headers['X-Accel-Redirect'] = f'{internal_prefix}{filename}'
+    response.headers['Content-Type'] = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    return response
+
+# Uploaded filenames carry a random token from save_picture, so a given URL never changes content
+UPLOAD_MAX_AGE = 86400
+
+def immutable_upload(response):
+    """Let browsers and CDNs keep an uploaded image without revalidating"""
+    response.cache_control.public = True
+    response.cache_control.max_age = UPLOAD_MAX_AGE
+    response.cache_control.immutable = True
+    return response
+
 # Route to serve images from user's home directory
 @app.route('/user-uploads/<filename>')
 def user_uploads(filename):
-    user_home = os.path.expanduser("~")
-    upload_folder = os.path.join(user_home, 'captain_signature_uploads', 'product_images')
-    return send_from_directory(upload_folder, filename)
+    if app.config.get('USE_XSENDFILE'):
+        # nginx serves the file itself and keeps our Cache-Control header, via:
+        #   location /internal-uploads/ { internal; alias ~/captain_signature_uploads/product_images/; }
+        return immutable_upload(accel_redirect(USER_UPLOAD_DIR, '/internal-uploads/', filename))
+    
+    # conditional=True (the default) answers If-None-Match / If-Modified-Since with a bodiless 304
+    return immutable_upload(send_from_directory(USER_UPLOAD_DIR, filename, max_age=UPLOAD_MAX_AGE))
 
 @app.route('/tmp-uploads/<filename>')
 def tmp_uploads(filename):
     """Serve images from /tmp directory using send_file for better reliability"""
-    directory = '/tmp/captain_signature_uploads/products'
-    file_path = os.path.join(directory, filename)
+    if app.config.get('USE_XSENDFILE'):
+        # nginx serves the file itself and keeps our Cache-Control header, via:
+        #   location /internal-tmp-uploads/ { internal; alias /tmp/captain_signature_uploads/products/; sendfile on; }
+        return immutable_upload(accel_redirect(TMP_UPLOAD_DIR, '/internal-tmp-uploads/', filename))
     
-    print(f"\n=== TMP UPLOADS DEBUG ===")
-    print(f"Attempting to serve: {filename}")
-    print(f"Full path: {file_path}")
-    print(f"File exists: {os.path.exists(file_path)}")
-    
-    if not os.path.exists(file_path):
-        if os.path.exists(directory):
-            files = os.listdir(directory)
-            print(f"Files in directory: {files}")
-        return "File not found", 404
+    file_path = os.path.join(TMP_UPLOAD_DIR, filename)
     
     try:
-        response = make_response(send_file(file_path))
-        response.headers['Cache-Control'] = 'public, max-age=3600'
-        response.headers['Content-Type'] = 'image/jpeg'
-        print(f"✓ Successfully serving file: {filename}")
-        return response
+        # Return send_file's response as-is so the server's wsgi.file_wrapper (sendfile) is used.
+        # send_file stats the file itself, so a missing file surfaces here without a pre-check.
+        # conditional=True emits ETag/Last-Modified and answers revalidations with a bodiless 304.
+        return immutable_upload(send_file(file_path, conditional=True, etag=True, max_age=UPLOAD_MAX_AGE))
+    except FileNotFoundError:
+        return "File not found", 404
     except Exception as e:
-        print(f"❌ Error serving {filename}: {e}")
+        logger.error("Error serving %s: %s", filename, e)
         return f"Error serving file: {str(e)}", 500
 
 # Public debug route to check file existence
-@app.route('/public-debug-file/<filename>')
+@debug_route('/public-debug-file/<filename>')
 def public_debug_file(filename):
     """Public debug route to check if file exists (no login required)"""
     file_path = f'/tmp/captain_signature_uploads/products/{filename}'
@@ -490,28 +593,28 @@ def public_debug_file(filename):
         'tmp_uploads_url': url_for('tmp_uploads', filename=filename, _external=True)
     }
     
-    if os.path.exists(file_path):
-        result['size'] = os.path.getsize(file_path)
-        result['permissions'] = oct(os.stat(file_path).st_mode)[-3:]
+    if result['exists']:
+        st = os.stat(file_path)
+        result['size'] = st.st_size
+        result['permissions'] = oct(st.st_mode)[-3:]
         result['readable'] = os.access(file_path, os.R_OK)
     
     return result
 
-@app.route('/public-test-image/<filename>')
+@debug_route('/public-test-image/<filename>')
 def public_test_image(filename):
     """Public route to test image serving (no login required)"""
     directory = '/tmp/captain_signature_uploads/products'
     file_path = os.path.join(directory, filename)
     
-    if not os.path.exists(file_path):
-        return f"File not found: {file_path}", 404
-    
     try:
         return send_file(file_path)
+    except FileNotFoundError:
+        return f"File not found: {file_path}", 404
     except Exception as e:
         return f"Error: {str(e)}", 500
     
-@app.route('/debug-email')
+@debug_route('/debug-email')
 def debug_email():
     """Debug email configuration"""
     import os
@@ -526,28 +629,39 @@ def debug_email():
     }
 
 # Debug route to check file details
-@app.route('/debug-file-check/<filename>')
+@debug_route('/debug-file-check/<filename>')
 def debug_file_check(filename):
     """Diagnose why a file isn't being served."""
     directory = '/tmp/captain_signature_uploads/products'
     full_path = os.path.join(directory, filename)
     
+    try:
+        st = os.stat(full_path)
+    except OSError:
+        st = None
+    try:
+        dir_list = os.listdir(directory)
+        dir_exists = True
+    except OSError:
+        dir_list = []
+        dir_exists = False
+    
     result = {
         'filename': filename,
         'full_path': full_path,
-        'file_exists': os.path.exists(full_path),
-        'is_file': os.path.isfile(full_path) if os.path.exists(full_path) else None,
-        'readable': os.access(full_path, os.R_OK) if os.path.exists(full_path) else None,
-        'writable': os.access(full_path, os.W_OK) if os.path.exists(full_path) else None,
-        'file_size': os.path.getsize(full_path) if os.path.exists(full_path) else None,
-        'permissions': oct(os.stat(full_path).st_mode)[-3:] if os.path.exists(full_path) else None,
-        'dir_exists': os.path.exists(directory),
-        'dir_list': os.listdir(directory) if os.path.exists(directory) else [],
+        'file_exists': st is not None,
+        'is_file': stat.S_ISREG(st.st_mode) if st else None,
+        'readable': os.access(full_path, os.R_OK) if st else None,
+        'writable': os.access(full_path, os.W_OK) if st else None,
+        'file_size': st.st_size if st else None,
+        'permissions': oct(st.st_mode)[-3:] if st else None,
+        'dir_exists': dir_exists,
+        'dir_list': dir_list,
     }
     return result
 
 # Find file in all possible locations
-@app.route('/find-file/<filename>')
+@debug_route('/find-file/<filename>')
 def find_file(filename):
     """Search for a file in all possible locations"""
     results = {}
@@ -565,23 +679,42 @@ def find_file(filename):
     
     for location in locations:
         full_path = os.path.join(location, filename)
-        exists = os.path.exists(full_path)
+        try:
+            st = os.stat(full_path)
+        except OSError:
+            st = None
         results[location] = {
-            'exists': exists,
-            'path': full_path if exists else None,
-            'dir_exists': os.path.exists(location)
+            'exists': st is not None,
+            'path': full_path if st else None,
+            # The directory must exist if the file does
+            'dir_exists': True if st else os.path.isdir(location)
         }
-        if exists:
-            results[location]['size'] = os.path.getsize(full_path)
+        if st:
+            results[location]['size'] = st.st_size
     return results
 
+# A shared /tmp can hold thousands of entries; debug listings stop after this many
+DEBUG_DIR_LIST_LIMIT = 100
+
+def list_dir_names(path, limit=DEBUG_DIR_LIST_LIMIT):
+    """First `limit` entry names in path (no per-entry stat), or [] if it can't be read"""
+    names = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if len(names) >= limit:
+                    break
+                names.append(entry.name)
+    except OSError:
+        pass
+    return names
+
 # Debug paths
-@app.route('/debug-paths')
+@debug_route('/debug-paths')
 def debug_paths():
     """Show all relevant paths"""
     import tempfile
-    tmp_uploads_dir = '/tmp/captain_signature_uploads/products'
-    os.makedirs(tmp_uploads_dir, mode=0o777, exist_ok=True)
+    tmp_uploads_dir = TMP_UPLOAD_DIR
     
     return {
         'cwd': os.getcwd(),
@@ -591,12 +724,12 @@ def debug_paths():
         'tmp_uploads_exists': os.path.exists(tmp_uploads_dir),
         'tmp_uploads_writable': os.access(tmp_uploads_dir, os.W_OK) if os.path.exists(tmp_uploads_dir) else False,
         'tmp_uploads_readable': os.access(tmp_uploads_dir, os.R_OK) if os.path.exists(tmp_uploads_dir) else False,
-        'tmp_dir_list': os.listdir('/tmp') if os.path.exists('/tmp') else [],
-        'tmp_uploads_list': os.listdir(tmp_uploads_dir) if os.path.exists(tmp_uploads_dir) else []
+        'tmp_dir_list': list_dir_names('/tmp'),
+        'tmp_uploads_list': list_dir_names(tmp_uploads_dir)
     }
 
 # Debug route to check configuration
-@app.route('/debug-config')
+@debug_route('/debug-config')
 def debug_config():
     """Debug route to check configuration"""
     return {
@@ -607,7 +740,7 @@ def debug_config():
         'postgres_prisma_url_env': 'set' if os.environ.get('POSTGRES_PRISMA_URL') else 'not set',
     }
 
-@app.route('/debug-cloudinary')
+@debug_route('/debug-cloudinary')
 def debug_cloudinary():
     """Check Cloudinary configuration"""
     return {
@@ -617,7 +750,7 @@ def debug_cloudinary():
         'is_vercel': app.config.get('IS_VERCEL', False),
     }
 
-@app.route('/debug-db')
+@debug_route('/debug-db')
 def debug_db():
     try:
         result = db.session.execute(text('SELECT 1')).scalar()
@@ -627,13 +760,13 @@ def debug_db():
             'database_url': os.environ.get('DATABASE_URL', 'not set')[:20] + '...' if os.environ.get('DATABASE_URL') else 'not set'
         }
     except Exception as e:
-        return {
-            'status': 'error',
-            'error': str(e),
-            'traceback': traceback.format_exc()
-        }, 500
+        logger.exception("Database check failed")
+        result = {'status': 'error', 'error': str(e)}
+        if app.debug:
+            result['traceback'] = traceback.format_exc()
+        return result, 500
 
-@app.route('/debug-uploads')
+@debug_route('/debug-uploads')
 def debug_uploads():
     """Debug route to check uploaded files"""
     results = []
@@ -647,13 +780,13 @@ def debug_uploads():
         results.append(f"  Writable: {os.access(tmp_path, os.W_OK)}")
         
         try:
-            files = os.listdir(tmp_path)
-            results.append(f"Found {len(files)} files:")
-            for f in files[-10:]:
-                file_path = os.path.join(tmp_path, f)
-                size = os.path.getsize(file_path)
-                perms = oct(os.stat(file_path).st_mode)[-3:]
-                results.append(f"  - {f} ({size} bytes, permissions: {perms})")
+            # One directory read; DirEntry.stat() reuses what scandir already fetched
+            with os.scandir(tmp_path) as it:
+                entries = list(it)
+            results.append(f"Found {len(entries)} files:")
+            for entry in entries[-10:]:
+                st = entry.stat()
+                results.append(f"  - {entry.name} ({st.st_size} bytes, permissions: {oct(st.st_mode)[-3:]})")
         except Exception as e:
             results.append(f"✗ Error listing files: {e}")
     else:
@@ -673,7 +806,7 @@ def debug_uploads():
     
     results.append("<h3>Products in Database</h3>")
     try:
-        products = Product.query.limit(10).all()
+        products = Product.query.options(load_only(Product.id, Product.name, Product.image)).limit(10).all()
         for p in products:
             results.append(f"Product {p.id}: {p.name} - Image: {p.image}")
     except Exception as e:
@@ -681,10 +814,10 @@ def debug_uploads():
     
     return "<br>".join(results)
 
-@app.route('/debug-product/<int:product_id>')
+@debug_route('/debug-product/<int:product_id>')
 def debug_product(product_id):
     """Debug a specific product"""
-    product = Product.query.get_or_404(product_id)
+    product = db.get_or_404(Product, product_id)
     
     if product.image:
         if product.image.startswith('tmp:'):
@@ -713,14 +846,154 @@ def debug_product(product_id):
         'file_readable': os.access(file_path, os.R_OK) if file_exists else None
     }
 
+# Columns the product listing templates actually render (skips the description text)
+PRODUCT_LIST_COLUMNS = (Product.id, Product.name, Product.price, Product.image, Product.stock, Product.category)
+
+# Accepted product image types, as a tuple so one str.endswith call checks them all
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif')
+
+# Homepage products shared across requests; cleared whenever products change
+FEATURED_CACHE_TTL = 60
+_featured_cache = {'rows': None, 'expires': 0}
+
+def get_featured_products():
+    """Products for the homepage, re-queried at most once every FEATURED_CACHE_TTL seconds"""
+    if _featured_cache['rows'] is None or time.monotonic() >= _featured_cache['expires']:
+        # Plain rows rather than ORM objects so they outlive the request's session.
+        # Newest first, read off the created_at index, so the 8 rows are deterministic.
+        _featured_cache['rows'] = db.session.execute(
+            select(*PRODUCT_LIST_COLUMNS).order_by(Product.created_at.desc()).limit(8)
+        ).all()
+        _featured_cache['expires'] = time.monotonic() + FEATURED_CACHE_TTL
+    return _featured_cache['rows']
+
+# Product listing pages per (category filter, page number); category None = all products
+PRODUCTS_CACHE_TTL = 300
+PRODUCTS_CACHE_MAX_KEYS = 32
+_products_cache = {}
+
+def get_listed_products(category=None, page=1):
+    """One page of products for /products as (rows, total), re-queried at most once
+    every PRODUCTS_CACHE_TTL seconds per category and page"""
+    key = (category, page)
+    entry = _products_cache.get(key)
+    if entry is None or time.monotonic() >= entry[1]:
+        per_page = app.config['PRODUCTS_PER_PAGE']
+        stmt = select(*PRODUCT_LIST_COLUMNS)
+        count_stmt = select(func.count(Product.id))
+        if category:
+            stmt = stmt.where(Product.category == category)
+            count_stmt = count_stmt.where(Product.category == category)
+        stmt = stmt.order_by(Product.id).limit(per_page).offset((page - 1) * per_page)
+        rows = db.session.execute(stmt).all()
+        total = db.session.execute(count_stmt).scalar() or 0
+        # The category and page come from the query string, so don't let junk values pile up
+        if len(_products_cache) >= PRODUCTS_CACHE_MAX_KEYS:
+            _products_cache.clear()
+        entry = ((rows, total), time.monotonic() + PRODUCTS_CACHE_TTL)
+        _products_cache[key] = entry
+    return entry[0]
+
+def clear_product_caches():
+    """Drop cached product listings after products are added, edited or deleted"""
+    _featured_cache['rows'] = None
+    _homepage_cache['body'] = None
+    _products_cache.clear()
+    clear_dashboard_cache()
+
+# Admin dashboard counts shared across requests; cleared when users, products or orders change
+DASHBOARD_CACHE_TTL = 60
+_dashboard_cache = {'metrics': None, 'expires': 0}
+
+def get_dashboard_metrics():
+    """Headline numbers for the admin dashboard, recomputed at most once every DASHBOARD_CACHE_TTL seconds"""
+    if _dashboard_cache['metrics'] is not None and time.monotonic() < _dashboard_cache['expires']:
+        return _dashboard_cache['metrics']
+    
+    # Plain datetime bounds on the bare column keep the filters index range scans.
+    # created_at is stored via datetime.utcnow, so the bounds are in UTC too.
+    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    month_start = today_start.replace(day=1)
+    
+    def count_where(condition):
+        return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+    
+    # One aggregate pass per table, cross-joined so everything comes back in one round-trip
+    users = select(
+        func.count(User.id).label('total_users'),
+        count_where(User.created_at >= today_start).label('new_users_today'),
+    ).subquery()
+    products = select(
+        func.count(Product.id).label('total_products'),
+        count_where(Product.created_at >= month_start).label('new_products_this_month'),
+        count_where(and_(Product.stock > 0, Product.stock <= 5)).label('low_stock_count'),
+        count_where(Product.stock == 0).label('out_of_stock_count'),
+        count_where(Product.stock > 5).label('in_stock_count'),
+    ).subquery()
+    orders = select(
+        func.count(Order.id).label('total_orders'),
+        count_where(Order.status == 'pending').label('pending_orders_count'),
+        func.coalesce(func.sum(Order.total_amount), 0).label('total_revenue'),
+    ).subquery()
+    
+    row = db.session.execute(
+        select(users, products, orders)
+        .select_from(users.join(products, true()).join(orders, true()))
+    ).one()
+    metrics = dict(row._mapping)
+    
+    _dashboard_cache['metrics'] = metrics
+    _dashboard_cache['expires'] = time.monotonic() + DASHBOARD_CACHE_TTL
+    return metrics
+
+def clear_dashboard_cache():
+    """Drop the cached dashboard numbers after users, products or orders change"""
+    _dashboard_cache['metrics'] = None
+
+def is_shared_view():
+    """True when the page shows nothing user-specific (anonymous, empty cart, no flashes)"""
+    return (not current_user.is_authenticated
+            and not getattr(g, 'cart_count', 0)
+            and '_flashes' not in session)
+
+def shared_page_response(body, max_age, shared):
+    """Response for a page rendered for a shared view: public caching plus an ETag, so
+    browsers and CDNs revalidate with If-None-Match and get a bodiless 304 when unchanged.
+    `shared` must come from is_shared_view() before rendering, since rendering pops the flashes."""
+    response = make_response(body)
+    if shared:
+        # Vary: Cookie (added by Flask since the session was read) keeps a logged-in
+        # visitor from being handed a browser's copy of the anonymous page
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+        response.add_etag()
+        response.make_conditional(request)
+    return response
+
+# Listing and detail pages change only when an admin edits products
+CATALOG_PAGE_MAX_AGE = 60
+
+# Rendered homepage for anonymous visitors; cleared with the product caches
+HOMEPAGE_CACHE_TTL = 30
+_homepage_cache = {'body': None, 'expires': 0}
+
 # Routes
 @app.route('/')
 def index():
-    try:
-        products = Product.query.limit(8).all()
-    except:
-        products = []
-    return render_template('index.html', products=products)
+    shared = is_shared_view()
+    if shared and _homepage_cache['body'] is not None and time.monotonic() < _homepage_cache['expires']:
+        body = _homepage_cache['body']
+    else:
+        try:
+            products = get_featured_products()
+        except:
+            products = []
+        body = render_template('index.html', products=products)
+        if shared:
+            _homepage_cache['body'] = body
+            _homepage_cache['expires'] = time.monotonic() + HOMEPAGE_CACHE_TTL
+    
+    return shared_page_response(body, HOMEPAGE_CACHE_TTL, shared)
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -755,30 +1028,41 @@ def signup():
                 flash('All fields are required', 'danger')
                 return render_template('signup.html', form=SignupForm())
             
-            if User.query.filter_by(email=email).first():
-                flash('Email already registered', 'danger')
-                return render_template('signup.html', form=SignupForm())
-            
-            if User.query.filter_by(username=username).first():
-                flash('Username already taken', 'danger')
+            # One lookup for both fields; the unique constraints remain the final check
+            existing = db.session.execute(
+                select(User.email, User.username)
+                .where((User.email == email) | (User.username == username))
+                .limit(1)
+            ).first()
+            if existing:
+                if existing.email == email:
+                    flash('Email already registered', 'danger')
+                else:
+                    flash('Username already taken', 'danger')
                 return render_template('signup.html', form=SignupForm())
             
-            hashed_password = generate_password_hash(password)
+            hashed_password = generate_password_hash(password, method=app.config['PASSWORD_HASH_METHOD'])
             user = User(
                 username=username,
                 email=email,
                 password=hashed_password
             )
             db.session.add(user)
-            db.session.commit()
+            try:
+                db.session.commit()
+                clear_dashboard_cache()
+            except IntegrityError:
+                # Someone registered the same email or username since the lookup above
+                db.session.rollback()
+                flash('Email or username already registered', 'danger')
+                return render_template('signup.html', form=SignupForm())
             
             flash('Account created! You can now log in.', 'success')
             return redirect(url_for('login'))
             
         except Exception as e:
             db.session.rollback()
-            print(f"Signup error: {str(e)}")
-            print(traceback.format_exc())
+            logger.exception("Signup error")
             flash('Registration failed. Please try again.', 'danger')
             return render_template('signup.html', form=SignupForm())
     
@@ -795,26 +1079,23 @@ def logout():
 @login_required
 def dashboard():
     if current_user.is_admin:
-        now = datetime.now()
-        
-        total_users = User.query.count()
-        total_products = Product.query.count()
-        total_orders = Order.query.count()
-        
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        new_users_today = User.query.filter(User.created_at >= today_start).count()
-        
-        month_start = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        new_products_this_month = Product.query.filter(Product.created_at >= month_start).count()
-        
-        pending_orders_count = Order.query.filter_by(status='pending').count()
-        total_revenue = db.session.query(db.func.sum(Order.total_amount)).scalar() or 0
-        
-        recent_orders = Order.query.order_by(Order.order_date.desc()).limit(5).all()
-        
-        low_stock_count = Product.query.filter(Product.stock <= 5).filter(Product.stock > 0).count()
-        out_of_stock_count = Product.query.filter_by(stock=0).count()
-        in_stock_count = Product.query.filter(Product.stock > 5).count()
+        # UTC, like the order and signup times shown next to it
+        now = datetime.utcnow()
+        # Read-only page: nothing pending to flush before these queries
+        with db.session.no_autoflush:
+            metrics = get_dashboard_metrics()
+            # Just the columns the widgets show, with the customer joined in
+            recent_orders = db.session.execute(
+                select(Order.id, Order.order_number, Order.order_date, Order.status,
+                       Order.total_amount, Order.shipping_email,
+                       User.username.label('customer_username'), User.email.label('customer_email'))
+                .outerjoin(User, Order.user_id == User.id)
+                .order_by(Order.order_date.desc())
+                .limit(5)
+            ).all()
+            recent_users = db.session.execute(
+                select(User.username, User.created_at).order_by(User.created_at.desc()).limit(2)
+            ).all()
         
         recent_activities = []
         
@@ -825,7 +1106,6 @@ def dashboard():
                 'time': f'{order.order_date.strftime("%H:%M")}'
             })
         
-        recent_users = User.query.order_by(User.created_at.desc()).limit(2).all()
         for user in recent_users:
             recent_activities.append({
                 'icon': 'user',
@@ -835,69 +1115,104 @@ def dashboard():
         
         return render_template('dashboard/admin.html',
                              now=now,
-                             total_users=total_users,
-                             new_users_today=new_users_today,
-                             total_products=total_products,
-                             new_products_this_month=new_products_this_month,
-                             total_orders=total_orders,
-                             pending_orders_count=pending_orders_count,
-                             total_revenue=total_revenue,
                              revenue_growth=0,
                              recent_orders=recent_orders,
-                             low_stock_count=low_stock_count,
-                             out_of_stock_count=out_of_stock_count,
-                             in_stock_count=in_stock_count,
-                             recent_activities=recent_activities)
+                             recent_activities=recent_activities,
+                             **metrics)
     else:
         orders = Order.query.filter_by(user_id=current_user.id).order_by(Order.order_date.desc()).all()
         return render_template('dashboard/customer.html', orders=orders)
         
 @app.route('/products')
 def products():
-    category = request.args.get('category')
-    if category:
-        products = Product.query.filter_by(category=category).all()
-    else:
-        products = Product.query.all()
-    return render_template('products.html', products=products)
+    category = request.args.get('category') or None
+    page = max(request.args.get('page', 1, type=int), 1)
+    shared = is_shared_view()
+    with db.session.no_autoflush:
+        products, total = get_listed_products(category, page)
+    first = (page - 1) * app.config['PRODUCTS_PER_PAGE'] + 1
+    last = first + len(products) - 1
+    body = render_template('products.html', products=products, category=category,
+                           page=page, has_next=last < total,
+                           first=first, last=last, total=total)
+    return shared_page_response(body, CATALOG_PAGE_MAX_AGE, shared)
 
 @app.route('/product/<int:product_id>')
 def product_detail(product_id):
-    product = Product.query.get_or_404(product_id)
-    return render_template('product_detail.html', product=product)
+    product = db.get_or_404(Product, product_id)
+    shared = is_shared_view()
+    return shared_page_response(render_template('product_detail.html', product=product),
+                                CATALOG_PAGE_MAX_AGE, shared)
 
 # Cart Routes
 @app.route('/add_to_cart/<int:product_id>', methods=['POST'])
 def add_to_cart(product_id):
     """Add product to cart"""
-    product = Product.query.get_or_404(product_id)
+    # Only the fields the cart stores, as a plain row rather than a Product object
+    product = db.session.execute(
+        select(Product.id, Product.stock, Product.price, Product.name)
+        .where(Product.id == product_id)
+    ).first() or abort(404)
     quantity = int(request.form.get('quantity', 1))
     
     if quantity > product.stock:
         flash(f'Sorry, only {product.stock} items available.', 'danger')
         return redirect(url_for('product_detail', product_id=product_id))
     
-    cart = Cart()
+    cart = current_cart()
     cart.add(
         product_id=product.id,
         quantity=quantity,
         price=product.price,
-        name=product.name,
-        image=product.image
+        name=product.name
     )
     
     flash(f'{product.name} added to cart!', 'success')
     return redirect(url_for('view_cart'))
 
+def apply_stock_changes(changes):
+    """Add each {product_id: delta} to stock in a single UPDATE ... CASE statement"""
+    if not changes:
+        return
+    products_table = Product.__table__
+    db.session.execute(
+        products_table.update()
+        .where(products_table.c.id.in_(list(changes)))
+        .values(stock=products_table.c.stock + case(dict(changes), value=products_table.c.id))
+    )
+
+def load_cart_products(cart_contents):
+    """Fetch every product in the cart with one IN query, keyed by id"""
+    product_ids = [int(product_id) for product_id in cart_contents]
+    if not product_ids:
+        return {}
+    return {product.id: product for product in Product.query.filter(Product.id.in_(product_ids)).all()}
+
+def compute_totals(cart, settings):
+    """Subtotal, delivery fee, total and free-delivery message for the cart under the current settings"""
+    subtotal = cart.get_subtotal()
+    
+    if settings.free_delivery_threshold > 0 and subtotal >= settings.free_delivery_threshold:
+        delivery_fee = 0
+        free_delivery_message = f"FREE DELIVERY (Orders above {settings.currency}{settings.free_delivery_threshold:,.0f})"
+    else:
+        delivery_fee = settings.delivery_fee
+        free_delivery_message = None
+    
+    return subtotal, delivery_fee, subtotal + delivery_fee, free_delivery_message
+
 @app.route('/cart')
 def view_cart():
     """View cart page"""
-    cart = Cart()
-    settings = Settings.get_settings()
+    cart = current_cart()
+    settings = g.settings
     
+    cart_contents = cart.get_cart()
+    with db.session.no_autoflush:
+        products_by_id = load_cart_products(cart_contents)
     cart_items = []
-    for product_id, item in cart.get_cart().items():
-        product = Product.query.get(int(product_id))
+    for product_id, item in cart_contents.items():
+        product = products_by_id.get(int(product_id))
         if product:
             cart_items.append({
                 'product': product,
@@ -905,16 +1220,7 @@ def view_cart():
                 'subtotal': item['price'] * item['quantity']
             })
     
-    subtotal = cart.get_subtotal()
-    
-    if settings.free_delivery_threshold > 0 and subtotal >= settings.free_delivery_threshold:
-        delivery_fee = 0
-        free_delivery_message = f"FREE DELIVERY (Orders above {settings.currency}{settings.free_delivery_threshold:,.0f})"
-    else:
-        delivery_fee = settings.delivery_fee
-        free_delivery_message = None
-    
-    total = subtotal + delivery_fee
+    subtotal, delivery_fee, total, free_delivery_message = compute_totals(cart, settings)
     
     return render_template('cart.html', 
                          cart_items=cart_items, 
@@ -928,11 +1234,13 @@ def view_cart():
 def update_cart(product_id):
     """Update cart item quantity"""
     quantity = int(request.form.get('quantity', 0))
-    cart = Cart()
-    product = Product.query.get_or_404(product_id)
+    cart = current_cart()
+    stock = db.session.execute(select(Product.stock).where(Product.id == product_id)).scalar_one_or_none()
+    if stock is None:
+        abort(404)
     
-    if quantity > product.stock:
-        flash(f'Sorry, only {product.stock} items available.', 'danger')
+    if quantity > stock:
+        flash(f'Sorry, only {stock} items available.', 'danger')
         return redirect(url_for('view_cart'))
     
     cart.update(product_id, quantity)
@@ -947,7 +1255,7 @@ def update_cart(product_id):
 @app.route('/remove_from_cart/<int:product_id>')
 def remove_from_cart(product_id):
     """Remove item from cart"""
-    cart = Cart()
+    cart = current_cart()
     cart.remove(product_id)
     flash('Item removed from cart.', 'info')
     return redirect(url_for('view_cart'))
@@ -955,12 +1263,12 @@ def remove_from_cart(product_id):
 @app.route('/clear_cart')
 def clear_cart():
     """Clear entire cart"""
-    cart = Cart()
+    cart = current_cart()
     cart.clear()
     flash('Cart has been cleared.', 'info')
     return redirect(url_for('view_cart'))
 
-@app.route('/debug-order-email/<order_number>')
+@debug_route('/debug-order-email/<order_number>')
 @login_required
 def debug_order_email(order_number):
     """Detailed debug for order email"""
@@ -1026,8 +1334,8 @@ def debug_order_email(order_number):
 def checkout():
     """Checkout page - Cash on Delivery only"""
     try:
-        cart = Cart()
-        settings = Settings.get_settings()
+        cart = current_cart()
+        settings = g.settings
         
         if cart.get_total_items() == 0:
             flash('Your cart is empty.', 'warning')
@@ -1043,19 +1351,32 @@ def checkout():
             customer_notes = request.form.get('customer_notes')
             
             # Validate Nigerian state
-            if shipping_state not in NIGERIA_STATES:
+            if shipping_state not in NIGERIA_STATES_SET:
                 flash('Please select a valid Nigerian state.', 'danger')
                 return redirect(url_for('checkout'))
             
-            # Calculate totals
-            subtotal = cart.get_subtotal()
+            # Lock the cart's products up front so stock can't be oversold
+            cart_contents = cart.get_cart()
+            product_ids = [int(product_id) for product_id in cart_contents]
+            products_by_id = {
+                product.id: product
+                for product in Product.query.filter(Product.id.in_(product_ids)).with_for_update().all()
+            }
             
-            if settings.free_delivery_threshold > 0 and subtotal >= settings.free_delivery_threshold:
-                delivery_fee = 0
-            else:
-                delivery_fee = settings.delivery_fee
+            # Check stock against the locked rows; release the locks before bailing out
+            for product_id, item in cart_contents.items():
+                product = products_by_id.get(int(product_id))
+                if product is None:
+                    db.session.rollback()
+                    flash(f'{item.get("name") or "An item"} is no longer available. Please remove it from your cart.', 'danger')
+                    return redirect(url_for('view_cart'))
+                if item['quantity'] > product.stock:
+                    db.session.rollback()
+                    flash(f'Sorry, only {product.stock} of {product.name} left in stock.', 'danger')
+                    return redirect(url_for('view_cart'))
             
-            total_amount = subtotal + delivery_fee
+            # Calculate totals
+            subtotal, delivery_fee, total_amount, _ = compute_totals(cart, settings)
             
             # Create order with Cash on Delivery
             order = Order(
@@ -1078,18 +1399,24 @@ def checkout():
             db.session.add(order)
             db.session.flush()
             
-            for product_id, item in cart.get_cart().items():
-                product = Product.query.get(int(product_id))
-                order_item = OrderItem(
-                    order_id=order.id,
-                    product_id=product.id,
-                    quantity=item['quantity'],
-                    price=item['price'],
-                    product_name=product.name,
-                    product_image=product.image
-                )
-                db.session.add(order_item)
-                product.stock -= item['quantity']
+            # Insert all order items and decrement stock in one statement each
+            order_items = []
+            stock_changes = {}
+            for product_id, item in cart_contents.items():
+                product = products_by_id[int(product_id)]
+                order_items.append({
+                    'order_id': order.id,
+                    'product_id': product.id,
+                    'quantity': item['quantity'],
+                    'price': item['price'],
+                    'product_name': product.name,
+                    'product_image': product.image
+                })
+                stock_changes[product.id] = -item['quantity']
+            
+            # Plain mappings through a Core-level insert: one multi-row INSERT, no per-object unit of work
+            db.session.execute(insert(OrderItem), order_items)
+            apply_stock_changes(stock_changes)
             
             tracking = OrderTracking(
                 order_id=order.id,
@@ -1100,38 +1427,32 @@ def checkout():
             db.session.add(tracking)
             
             db.session.commit()
+            clear_product_caches()
             cart.clear()
             
             # ****** IMPORTANT: This is where emails are sent ******
             # Send email notifications
-            print("\n" + "="*60)
-            print(f"ORDER #{order.order_number} PLACED - SENDING EMAILS")
-            print("="*60)
-            
             try:
-                from email_utils import send_order_notifications
-                print("Calling send_order_notifications...")
                 result = send_order_notifications(app, order, current_user)
-                print(f"send_order_notifications returned: {result}")
                 
                 if result:
-                    print("✅ Emails sent successfully!")
+                    logger.info("Order %s placed, notification emails sent", order.order_number)
                 else:
-                    print("❌ Email sending failed - check email_utils.py for errors")
+                    logger.warning("Order %s placed, email sending failed - check email_utils.py", order.order_number)
                     
-            except Exception as e:
-                print(f"✗ ERROR in email sending: {e}")
-                import traceback
-                traceback.print_exc()
+            except Exception:
+                logger.exception("Error sending emails for order %s", order.order_number)
             # *******************************************************
             
             flash(f'Order #{order.order_number} placed successfully! You\'ll pay on delivery.', 'success')
             return redirect(url_for('track_order_result', order_number=order.order_number))
         
         # GET request - show checkout form
+        cart_contents = cart.get_cart()
+        products_by_id = load_cart_products(cart_contents)
         cart_items = []
-        for product_id, item in cart.get_cart().items():
-            product = Product.query.get(int(product_id))
+        for product_id, item in cart_contents.items():
+            product = products_by_id.get(int(product_id))
             if product:
                 cart_items.append({
                     'product': product,
@@ -1140,16 +1461,7 @@ def checkout():
                     'image': product.image
                 })
         
-        subtotal = cart.get_subtotal()
-        
-        if settings.free_delivery_threshold > 0 and subtotal >= settings.free_delivery_threshold:
-            delivery_fee = 0
-            free_delivery_message = f"FREE DELIVERY (Orders above {settings.currency}{settings.free_delivery_threshold:,.0f})"
-        else:
-            delivery_fee = settings.delivery_fee
-            free_delivery_message = None
-        
-        total = subtotal + delivery_fee
+        subtotal, delivery_fee, total, free_delivery_message = compute_totals(cart, settings)
         
         return render_template('checkout.html', 
                              cart_items=cart_items, 
@@ -1161,12 +1473,12 @@ def checkout():
                              settings=settings,
                              free_delivery_message=free_delivery_message)
     except Exception as e:
-        print(f"Checkout error: {e}")
-        print(traceback.format_exc())
+        db.session.rollback()
+        logger.exception("Checkout error")
         flash(f'An error occurred: {str(e)}', 'danger')
         return redirect(url_for('view_cart'))
 
-@app.route('/test-last-order-email')
+@debug_route('/test-last-order-email')
 @login_required
 def test_last_order_email():
     """Test sending email for the most recent order"""
@@ -1191,7 +1503,7 @@ def test_last_order_email():
     except Exception as e:
         return f"Error: {str(e)}"
     
-@app.route('/test-email-now')
+@debug_route('/test-email-now')
 def test_email_now():
     """Test email with sample data"""
     from email_utils import send_order_notifications
@@ -1218,7 +1530,7 @@ def test_email_now():
     except Exception as e:
         return f"Error: {str(e)}"
     
-@app.route('/test-email-public')
+@debug_route('/test-email-public')
 def test_email_public():
     """Test email without requiring login"""
     from email_utils import send_order_notifications
@@ -1260,12 +1572,16 @@ def track_order_page():
         order_number = request.form.get('order_number')
         email = request.form.get('email')
         
-        print(f"Searching for order: {order_number} with email: {email}")
-        order = Order.query.filter_by(order_number=order_number).first()
+        # Only the two emails are needed to authorise the lookup, so skip hydrating the order
+        order = db.session.execute(
+            select(Order.order_number, Order.shipping_email, User.email.label('customer_email'))
+            .outerjoin(User, Order.user_id == User.id)
+            .where(Order.order_number == order_number)
+        ).first()
         
         if order:
-            customer_email = order.customer.email if order.customer else None
-            if (customer_email and customer_email.lower() == email.lower()) or (order.shipping_email and order.shipping_email.lower() == email.lower()):
+            email = (email or '').lower()
+            if (order.customer_email and order.customer_email.lower() == email) or (order.shipping_email and order.shipping_email.lower() == email):
                 return redirect(url_for('track_order_result', order_number=order.order_number))
             else:
                 flash('Email does not match this order.', 'danger')
@@ -1279,7 +1595,11 @@ def track_order_page():
 @app.route('/track/<order_number>')
 def track_order_result(order_number):
     """Display order tracking information"""
-    order = Order.query.filter_by(order_number=order_number).first_or_404()
+    with db.session.no_autoflush:
+        # The page always lists the items, so fetch them in the same query as the order.
+        # tracking_updates stays lazy: it is only read while the order is still trackable.
+        order = (Order.query.options(joinedload(Order.items))
+                 .filter_by(order_number=order_number).first_or_404())
     
     # Check if order should be trackable
     if order.status in ['delivered', 'cancelled']:
@@ -1296,7 +1616,7 @@ def track_order_result(order_number):
 @login_required
 def cancel_order(order_id):
     """Allow customers to cancel their orders within a time window"""
-    order = Order.query.get_or_404(order_id)
+    order = db.get_or_404(Order, order_id)
     
     # Verify order belongs to current user
     if order.user_id != current_user.id:
@@ -1325,13 +1645,23 @@ def cancel_order(order_id):
     if can_cancel:
         try:
             old_status = order.status
-            order.status = 'cancelled'
+            # Only cancel if the status is still what we checked, so a double-submit or a
+            # concurrent admin update can't restore the same stock twice
+            result = db.session.execute(
+                update(Order)
+                .where(Order.id == order.id, Order.status == old_status)
+                .values(status='cancelled')
+            )
+            if result.rowcount == 0:
+                db.session.rollback()
+                flash('This order was updated in the meantime and was not cancelled.', 'warning')
+                return redirect(url_for('track_order_result', order_number=order.order_number))
             
-            # Restore stock
+            # Restore stock in one statement instead of loading each product
+            stock_changes = defaultdict(int)
             for item in order.items:
-                product = Product.query.get(item.product_id)
-                if product:
-                    product.stock += item.quantity
+                stock_changes[item.product_id] += item.quantity
+            apply_stock_changes(stock_changes)
             
             # Add tracking update
             tracking = OrderTracking(
@@ -1342,6 +1672,7 @@ def cancel_order(order_id):
             )
             db.session.add(tracking)
             db.session.commit()
+            clear_product_caches()
             
             # Send cancellation email
             try:
@@ -1370,27 +1701,21 @@ def add_product():
         image_file = None
         if form.image.data:
             try:
-                print(f"\n--- Image Upload Debug ---")
-                print(f"Form image data: {form.image.data}")
-                print(f"Filename: {form.image.data.filename}")
+                logger.debug("Image upload: %s", form.image.data.filename)
                 
                 if form.image.data.filename:
-                    allowed_extensions = ['jpg', 'jpeg', 'png', 'gif']
-                    file_ext = form.image.data.filename.rsplit('.', 1)[1].lower() if '.' in form.image.data.filename else ''
-                    
-                    if file_ext not in allowed_extensions:
-                        flash(f'Invalid file type. Allowed: {", ".join(allowed_extensions)}', 'danger')
+                    if not form.image.data.filename.lower().endswith(IMAGE_EXTENSIONS):
+                        flash(f'Invalid file type. Allowed: {", ".join(ext[1:] for ext in IMAGE_EXTENSIONS)}', 'danger')
                         return render_template('add_product.html', form=form)
                     
                     image_file = save_picture(form.image.data)
                     flash('Image uploaded successfully!', 'success')
-                    print(f"Image saved as: {image_file}")
+                    logger.debug("Image saved as: %s", image_file)
                 else:
                     flash('No image selected.', 'warning')
             except Exception as e:
                 flash(f'Error uploading image: {str(e)}', 'danger')
-                print(f"Image upload error: {str(e)}")
-                traceback.print_exc()
+                logger.exception("Image upload error")
                 return render_template('add_product.html', form=form)
         
         product = Product(
@@ -1405,6 +1730,7 @@ def add_product():
         try:
             db.session.add(product)
             db.session.commit()
+            clear_product_caches()
             flash(f'Product "{product.name}" has been added successfully!', 'success')
             return redirect(url_for('admin_products'))
         except Exception as e:
@@ -1421,17 +1747,42 @@ def admin_customers():
     if not current_user.is_admin:
         abort(403)
     
-    now = datetime.now()
-    customers = User.query.filter_by(is_admin=False).order_by(User.created_at.desc()).all()
+    # created_at is stored in UTC, so "today" starts at UTC midnight
+    now = datetime.utcnow()
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    
+    # Order count and spend per customer, aggregated once in the database
+    order_totals = (
+        select(Order.user_id,
+               func.count(Order.id).label('order_count'),
+               func.sum(Order.total_amount).label('total_spent'))
+        .group_by(Order.user_id)
+        .subquery()
+    )
+    # One query for the whole page: just the columns the table shows (no password
+    # hash, no ORM objects), with each customer's order totals joined in
+    customers = db.session.execute(
+        select(User.id, User.username, User.email, User.phone, User.address,
+               User.city, User.state, User.created_at,
+               func.coalesce(order_totals.c.order_count, 0).label('order_count'),
+               func.coalesce(order_totals.c.total_spent, 0).label('total_spent'))
+        .outerjoin(order_totals, order_totals.c.user_id == User.id)
+        .where(User.is_admin.is_(False))
+        .order_by(User.created_at.desc())
+    ).all()
     
     # Calculate metrics for each customer
     customer_data = []
     total_orders_all = 0
+    new_today = 0
+    active_customers = 0
     
     for customer in customers:
-        order_count = len(customer.orders)
-        total_spent = sum(order.total_amount for order in customer.orders)
-        total_orders_all += order_count
+        total_orders_all += customer.order_count
+        if customer.order_count:
+            active_customers += 1
+        if customer.created_at and customer.created_at >= today_start:
+            new_today += 1
         
         customer_data.append({
             'id': customer.id,
@@ -1442,16 +1793,13 @@ def admin_customers():
             'city': customer.city,
             'state': customer.state,
             'created_at': customer.created_at,
-            'order_count': order_count,
-            'total_spent': total_spent,
-            'has_orders': order_count > 0,
-            'recent_orders': customer.orders[:5] if customer.orders else []
+            'order_count': customer.order_count,
+            'total_spent': customer.total_spent,
+            'has_orders': customer.order_count > 0
         })
     
-    # Calculate statistics
+    # Every customer is listed, so the total is simply the number of rows fetched
     total_customers = len(customer_data)
-    new_today = sum(1 for c in customer_data if c['created_at'].date() == datetime.today().date())
-    active_customers = sum(1 for c in customer_data if c['has_orders'])
     
     return render_template('admin/customers.html',
                          customers=customer_data,
@@ -1476,7 +1824,7 @@ def send_customer_email():
     body = request.form.get('body')
     send_copy = request.form.get('send_copy') == 'on'
     
-    customer = User.query.get_or_404(customer_id)
+    customer = db.get_or_404(User, customer_id)
     
     try:
         # Send email to customer
@@ -1506,7 +1854,7 @@ def edit_product(product_id):
     if not current_user.is_admin:
         abort(403)
     
-    product = Product.query.get_or_404(product_id)
+    product = db.get_or_404(Product, product_id)
     form = ProductForm()
     
     if request.method == 'GET':
@@ -1525,42 +1873,40 @@ def edit_product(product_id):
         
         if form.image.data and form.image.data.filename:
             try:
-                print(f"\n--- Image Update Debug ---")
-                print(f"Updating image for product: {product.name}")
+                logger.debug("Updating image for product: %s", product.name)
                 
                 if product.image:
                     if product.image.startswith('user_uploads:'):
                         filename = product.image.replace('user_uploads:', '')
-                        user_home = os.path.expanduser("~")
-                        old_image_path = os.path.join(user_home, 'captain_signature_uploads', 'product_images', filename)
+                        old_image_path = os.path.join(USER_UPLOAD_DIR, filename)
                     elif product.image.startswith('tmp:'):
                         filename = product.image.replace('tmp:', '')
-                        old_image_path = os.path.join('/tmp/captain_signature_uploads/products', filename)
+                        old_image_path = os.path.join(TMP_UPLOAD_DIR, filename)
                     else:
                         old_image_path = os.path.join(project_root, 'static', 'images', 'products', product.image)
                     
                     if os.path.exists(old_image_path):
                         os.remove(old_image_path)
-                        print(f"Deleted old image: {old_image_path}")
+                        logger.debug("Deleted old image: %s", old_image_path)
                 
                 product.image = save_picture(form.image.data)
                 flash('New image uploaded successfully!', 'success')
-                print(f"New image saved as: {product.image}")
+                logger.debug("New image saved as: %s", product.image)
                 
             except Exception as e:
                 flash(f'Error uploading image: {str(e)}', 'danger')
-                print(f"Image upload error: {e}")
-                traceback.print_exc()
+                logger.exception("Image upload error")
                 return render_template('edit_product.html', form=form, product=product)
         
         try:
             db.session.commit()
+            clear_product_caches()
             flash(f'Product "{product.name}" has been updated successfully!', 'success')
             return redirect(url_for('admin_products'))
         except Exception as e:
             db.session.rollback()
             flash(f'Error updating product: {str(e)}', 'danger')
-            print(f"Database error: {e}")
+            logger.exception("Error updating product")
     
     return render_template('edit_product.html', form=form, product=product)
 
@@ -1570,7 +1916,7 @@ def admin_products():
     if not current_user.is_admin:
         abort(403)
     
-    products = Product.query.all()
+    products = Product.query.options(load_only(*PRODUCT_LIST_COLUMNS)).all()
     return render_template('admin_products.html', products=products)
 
 @app.route('/admin/delete_product/<int:product_id>')
@@ -1579,18 +1925,17 @@ def delete_product(product_id):
     if not current_user.is_admin:
         abort(403)
     
-    product = Product.query.get_or_404(product_id)
+    product = db.get_or_404(Product, product_id)
     product_name = product.name
     
     if product.image:
         try:
             if product.image.startswith('user_uploads:'):
                 filename = product.image.replace('user_uploads:', '')
-                user_home = os.path.expanduser("~")
-                image_path = os.path.join(user_home, 'captain_signature_uploads', 'product_images', filename)
+                image_path = os.path.join(USER_UPLOAD_DIR, filename)
             elif product.image.startswith('tmp:'):
                 filename = product.image.replace('tmp:', '')
-                image_path = os.path.join('/tmp/captain_signature_uploads/products', filename)
+                image_path = os.path.join(TMP_UPLOAD_DIR, filename)
             else:
                 image_path = os.path.join(project_root, 'static', 'images', 'products', product.image)
             
@@ -1602,6 +1947,7 @@ def delete_product(product_id):
     
     db.session.delete(product)
     db.session.commit()
+    clear_product_caches()
     flash(f'Product "{product_name}" has been deleted!', 'success')
     return redirect(url_for('admin_products'))
 
@@ -1611,7 +1957,7 @@ def admin_orders():
     if not current_user.is_admin:
         abort(403)
     
-    orders = Order.query.order_by(Order.order_date.desc()).all()
+    orders = Order.query.options(selectinload(Order.customer)).order_by(Order.order_date.desc()).all()
     return render_template('admin_orders.html', orders=orders)
 
 @app.route('/admin/update_order/<int:order_id>/<status>')
@@ -1625,7 +1971,7 @@ def update_order_status(order_id, status):
         flash('Invalid status', 'danger')
         return redirect(url_for('admin_orders'))
     
-    order = Order.query.get_or_404(order_id)
+    order = db.get_or_404(Order, order_id)
     old_status = order.status
     order.status = status
     
@@ -1641,6 +1987,7 @@ def update_order_status(order_id, status):
         order.delivered_date = datetime.utcnow()
     
     db.session.commit()
+    clear_dashboard_cache()
     
     # Send email notification for status change
     try:
@@ -1726,7 +2073,7 @@ def forgot_password():
     
     return render_template('forgot_password.html')
 
-@app.route('/test-password-reset-email/<email>')
+@debug_route('/test-password-reset-email/<email>')
 def test_password_reset_email(email):
     """Test password reset email with detailed logging"""
     user = User.query.filter_by(email=email).first()
@@ -1751,11 +2098,11 @@ def test_password_reset_email(email):
             'message': 'Email sent successfully' if result else 'Email sending failed'
         }
     except Exception as e:
-        return {
-            'success': False,
-            'error': str(e),
-            'traceback': traceback.format_exc()
-        }
+        logger.exception("Password reset email test failed")
+        result = {'success': False, 'error': str(e)}
+        if app.debug:
+            result['traceback'] = traceback.format_exc()
+        return result
 
 @app.route('/reset-password/<token>', methods=['GET', 'POST'])
 def reset_password(token):
@@ -1785,7 +2132,7 @@ def reset_password(token):
         try:
             # Update password
             user = reset_token.user
-            user.password = generate_password_hash(password)
+            user.password = generate_password_hash(password, method=app.config['PASSWORD_HASH_METHOD'])
             
             # Mark token as used
             reset_token.used = True
@@ -1808,7 +2155,7 @@ def update_tracking(order_id):
     if not current_user.is_admin:
         abort(403)
     
-    order = Order.query.get_or_404(order_id)
+    order = db.get_or_404(Order, order_id)
     
     if request.method == 'POST':
         order.tracking_number = request.form.get('tracking_number')
@@ -1832,6 +2179,7 @@ def update_tracking(order_id):
                 pass
         
         db.session.commit()
+        clear_dashboard_cache()
         flash(f'Tracking information updated for order #{order.order_number}', 'success')
         return redirect(url_for('admin_orders'))
     
@@ -1843,26 +2191,63 @@ def bulk_tracking_update():
     if not current_user.is_admin:
         abort(403)
     
-    order_ids = request.form.getlist('order_ids')
+    order_ids = request.form.getlist('order_ids', type=int)
     status = request.form.get('bulk_status')
     
     if order_ids and status:
+        # Keep the admin's selection order, dropping duplicates
+        order_ids = list(dict.fromkeys(order_ids))
+        batch_size = app.config.get('BULK_UPDATE_BATCH_SIZE', 500)
         updated_count = 0
-        for order_id in order_ids:
-            order = Order.query.get(order_id)
-            if order:
-                old_status = order.status
-                order.status = status
-                tracking = OrderTracking(
-                    order_id=order.id,
-                    status=status,
-                    description=f'Bulk status update from {old_status} to {status}',
-                    updated_by='admin'
-                )
-                db.session.add(tracking)
-                updated_count += 1
         
-        db.session.commit()
+        # Work in fixed-size batches to stay under bind-parameter limits and keep transactions short
+        for start in range(0, len(order_ids), batch_size):
+            batch_ids = order_ids[start:start + batch_size]
+            
+            # No interim flushes while a batch is built; each batch is one commit
+            with db.session.no_autoflush:
+                if db.engine.dialect.name == 'postgresql':
+                    # One statement locks the rows, updates the ones whose status actually
+                    # changes and returns their previous status
+                    old_statuses = dict(db.session.execute(text(
+                        'WITH old AS (SELECT id, status AS old_status FROM "order" '
+                        'WHERE id = ANY(:ids) FOR UPDATE) '
+                        'UPDATE "order" o SET status = :status FROM old '
+                        'WHERE o.id = old.id AND old.old_status IS DISTINCT FROM :status '
+                        'RETURNING o.id, old.old_status'
+                    ), {'ids': batch_ids, 'status': status}).all())
+                    found_ids = [order_id for order_id in batch_ids if order_id in old_statuses]
+                else:
+                    # Read the current statuses in one IN query so the tracking notes keep the old value
+                    old_statuses = dict(db.session.execute(
+                        select(Order.id, Order.status).where(Order.id.in_(batch_ids))
+                    ).all())
+                    # Orders already in the target status need neither an UPDATE nor a tracking row
+                    found_ids = [order_id for order_id in batch_ids
+                                 if order_id in old_statuses and old_statuses[order_id] != status]
+                    
+                    if found_ids:
+                        # executemany UPDATE by primary key; each mapping can carry its own status
+                        db.session.bulk_update_mappings(Order, [
+                            {'id': order_id, 'status': status} for order_id in found_ids
+                        ])
+                
+                if found_ids:
+                    # ORM bulk INSERT - batched into multi-row statements ("insertmanyvalues")
+                    db.session.execute(insert(OrderTracking), [
+                        {
+                            'order_id': order_id,
+                            'status': status,
+                            'description': f'Bulk status update from {old_statuses[order_id]} to {status}',
+                            'updated_by': 'admin'
+                        }
+                        for order_id in found_ids
+                    ])
+            
+            db.session.commit()
+            updated_count += len(found_ids)
+        
+        clear_dashboard_cache()
         flash(f'Updated {updated_count} orders to {status}', 'success')
     
     return redirect(url_for('admin_orders'))
@@ -1875,6 +2260,8 @@ def admin_settings():
     if not current_user.is_admin:
         abort(403)
     
+    # This page edits and commits these rows, so read them fresh rather than from the
+    # per-process snapshots, which another worker may still hold with old values
     settings = Settings.get_settings()
     maintenance = MaintenanceSettings.get_settings()
     
@@ -1899,10 +2286,15 @@ def admin_settings():
     conversion_rate = 3.2  # Placeholder - implement actual calculation if needed
     
     if request.method == 'POST':
+        # Werkzeug returns None for missing or non-numeric values instead of raising
+        new_delivery_fee = request.form.get('delivery_fee', type=float)
+        new_threshold = request.form.get('free_delivery_threshold', type=float)
+        if new_delivery_fee is None or new_threshold is None:
+            flash('Delivery fee and free delivery threshold must be numbers.', 'danger')
+            return redirect(url_for('admin_settings'))
+        
         try:
             # Update store settings
-            new_delivery_fee = float(request.form.get('delivery_fee', 1500.00))
-            new_threshold = float(request.form.get('free_delivery_threshold', 0))
             new_site_name = request.form.get('site_name', 'Captain Signature')
             new_currency = request.form.get('currency', '₦')
             
@@ -1919,14 +2311,16 @@ def admin_settings():
             maintenance.updated_by = current_user.id
             
             db.session.commit()
+            Settings.clear_cache()
+            MaintenanceSettings.clear_cache()
+            # The homepage shows prices in the configured currency
+            _homepage_cache['body'] = None
             flash('Settings updated successfully!', 'success')
-            g.settings = settings
             
         except Exception as e:
             db.session.rollback()
             flash(f'Error updating settings: {str(e)}', 'danger')
-            print(f"Settings update error: {e}")
-            print(traceback.format_exc())
+            app.logger.exception("Settings update error")
         
         return redirect(url_for('admin_settings'))
     
@@ -1959,7 +2353,7 @@ def maintenance_preview():
                          preview=True)
 
 # Test route to verify upload location
-@app.route('/admin/test-upload-location')
+@debug_route('/admin/test-upload-location')
 @login_required
 def test_upload_location():
     if not current_user.is_admin:
@@ -1999,7 +2393,7 @@ def test_upload_location():
     
     return "<br>".join(results)
 
-@app.route('/debug-email-config')
+@debug_route('/debug-email-config')
 def debug_email_config():
     """Test email with current config"""
     import smtplib
@@ -2052,11 +2446,11 @@ def debug_email_config():
     
     return "<br>".join(results)
 
-@app.route('/simple-test')
+@debug_route('/simple-test')
 def simple_test():
     return "If you can see this, routing is working!"
 
-@app.route('/check-template')
+@debug_route('/check-template')
 def check_template():
     """Check if email template exists"""
     import os
@@ -2086,7 +2480,7 @@ def check_template():
     
     return "<br>".join(results)
 
-@app.route('/test-password-reset/<email>')
+@debug_route('/test-password-reset/<email>')
 def test_password_reset_debug(email):
     """Test password reset with detailed debugging"""
     from email_utils import send_password_reset_email
@@ -2135,7 +2529,7 @@ def test_password_reset_debug(email):
     
     return "<br>".join(output)
 
-@app.route('/create-test-user')
+@debug_route('/create-test-user')
 def create_test_user():
     """Create a test user for password reset testing"""
     try:
@@ -2159,7 +2553,17 @@ def create_test_user():
         db.session.rollback()
         return f"❌ Error: {str(e)}"
 
-@app.route('/debug-full')
+# Throwaway users in debug_full are deleted straight away and never log in, so they
+# share one hash computed on first use instead of paying for a fresh one per call
+_DUMMY_PASSWORD_HASH = None
+
+def dummy_password_hash():
+    global _DUMMY_PASSWORD_HASH
+    if _DUMMY_PASSWORD_HASH is None:
+        _DUMMY_PASSWORD_HASH = generate_password_hash('test123')
+    return _DUMMY_PASSWORD_HASH
+
+@debug_route('/debug-full')
 def debug_full():
     """Comprehensive database diagnostic"""
     results = []
@@ -2205,7 +2609,7 @@ def debug_full():
         test_user = User(
             username=test_username,
             email=test_email,
-            password=generate_password_hash('test123')
+            password=dummy_password_hash()
         )
         db.session.add(test_user)
         db.session.commit()
@@ -2221,13 +2625,14 @@ def debug_full():
     
     return "<br>".join(results)
 
-@app.route('/admin/debug-images')
+@debug_route('/admin/debug-images')
 @login_required
 def debug_images():
     if not current_user.is_admin:
         abort(403)
     
-    products = Product.query.all()
+    # The table only shows id, name and image; leave description and the rest unloaded
+    products = Product.query.options(load_only(Product.id, Product.name, Product.image)).all()
     result = "<h2>Product Image Debug</h2>"
     result += "<table border='1' cellpadding='10'>"
     result += "<tr><th>ID</th><th>Name</th><th>Image Path in DB</th><th>Image Type</th><th>Expected URL</th></tr>"
@@ -2260,13 +2665,13 @@ def debug_images():
     result += "</table>"
     return result
 
-@app.route('/admin/debug-order/<int:order_id>')
+@debug_route('/admin/debug-order/<int:order_id>')
 @login_required
 def debug_order(order_id):
     if not current_user.is_admin:
         abort(403)
     
-    order = Order.query.get_or_404(order_id)
+    order = db.get_or_404(Order, order_id)
     
     result = "<h2>Order Debug Information</h2>"
     result += f"<p><strong>Order #:</strong> {order.order_number}</p>"
@@ -2304,7 +2709,7 @@ def debug_order(order_id):
     result += "</table>"
     return result
 
-@app.route('/test-upload', methods=['GET', 'POST'])
+@debug_route('/test-upload', methods=['GET', 'POST'])
 def test_upload():
     """Simple test upload page"""
     if request.method == 'POST':
@@ -2327,7 +2732,7 @@ def test_upload():
     </form>
     '''
 
-@app.route('/debug-filesystem')
+@debug_route('/debug-filesystem')
 def debug_filesystem():
     """Test filesystem write access"""
     import tempfile
@@ -2357,7 +2762,7 @@ def debug_filesystem():
     
     return "<br>".join(results)
 
-@app.route('/test-simple-image/<filename>')
+@debug_route('/test-simple-image/<filename>')
 def test_simple_image(filename):
     """Absolute simplest image serving test"""
     file_path = f'/tmp/captain_signature_uploads/products/{filename}'
@@ -2365,26 +2770,41 @@ def test_simple_image(filename):
         return send_file(file_path)
     return "File not found", 404
 
+# Rendered error pages for anonymous visitors with an empty cart, keyed by template
+_ERROR_PAGE_CACHE = {}
+
+def render_error_page(template, status):
+    """Render an error page, reusing the cached body when nothing user-specific is shown"""
+    cacheable = is_shared_view()
+    if cacheable and template in _ERROR_PAGE_CACHE:
+        return _ERROR_PAGE_CACHE[template], status
+    
+    body = render_template(template)
+    if cacheable:
+        _ERROR_PAGE_CACHE[template] = body
+    return body, status
+
 # Error handlers
 @app.errorhandler(404)
 def not_found_error(error):
-    return render_template('404.html'), 404
+    return render_error_page('404.html', 404)
 
 @app.errorhandler(403)
 def forbidden_error(error):
-    return render_template('403.html'), 403
+    return render_error_page('403.html', 403)
 
 @app.errorhandler(500)
 def internal_error(error):
-    db.session.rollback()
-    logger.error(f"500 error occurred: {error}")
-    logger.error(traceback.format_exc())
-    return render_template('500.html'), 500
+    # Only roll back if the failed request actually opened a transaction
+    if db.session().in_transaction():
+        db.session.rollback()
+    logger.exception("500 error occurred: %s", error)
+    return render_error_page('500.html', 500)
 
 if __name__ == '__main__':
+    # Create tables and seed data if they don't exist
+    init_db()
     with app.app_context():
-        # Create tables if they don't exist
-        db.create_all()
         # Get maintenance status for display
         maintenance = MaintenanceSettings.get_settings()
     
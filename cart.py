@@ -11,7 +11,7 @@ class Cart:
         """Remove any invalid entries from cart"""
         if not isinstance(self.cart, dict):
             self.cart = {}
-            session['cart'] = self.cart
+            self._save()
             return
         
         # Remove entries with invalid data
@@ -24,24 +24,30 @@ class Cart:
             del self.cart[product_id]
         
         if to_remove:
-            session['cart'] = self.cart
-            session.modified = True
+            self._save()
     
-    def add(self, product_id, quantity=1, price=0, name='', image=''):
+    def _save(self):
+        """Write the cart back to the session along with its item count"""
+        session['cart'] = self.cart
+        # Kept alongside the cart so pages can show the badge without walking it
+        session['cart_count'] = self.get_total_items()
+        session.modified = True
+    
+    def add(self, product_id, quantity=1, price=0, name=''):
         """Add item to cart"""
         product_id = str(product_id)
         if product_id in self.cart:
             self.cart[product_id]['quantity'] += quantity
         else:
+            # The cart lives in the session cookie, so keep entries small; pages that show
+            # the cart load the product (image included) from the database anyway
             self.cart[product_id] = {
                 'quantity': quantity,
                 'price': float(price),
-                'name': name,
-                'image': image
+                'name': name
             }
-        session['cart'] = self.cart
-        session.modified = True
-        return self.get_total_items()
+        self._save()
+        return session['cart_count']
     
     def update(self, product_id, quantity):
         """Update item quantity"""
@@ -51,16 +57,14 @@ class Cart:
                 del self.cart[product_id]
             else:
                 self.cart[product_id]['quantity'] = quantity
-        session['cart'] = self.cart
-        session.modified = True
+        self._save()
     
     def remove(self, product_id):
         """Remove item from cart"""
         product_id = str(product_id)
         if product_id in self.cart:
             del self.cart[product_id]
-        session['cart'] = self.cart
-        session.modified = True
+        self._save()
     
     def get_cart(self):
         """Get cart contents"""
@@ -92,9 +96,8 @@ class Cart:
     
     def clear(self):
         """Clear the cart"""
-        session['cart'] = {}
-        session.modified = True
         self.cart = {}
+        self._save()
     
     def get_items_count(self):
         """Get count of unique items"""
@@ -42,18 +42,22 @@ class Config:
         # Only add PostgreSQL-specific options if using PostgreSQL
         if 'postgresql' in database_url:
             SQLALCHEMY_ENGINE_OPTIONS = {
-                'pool_size': 5,
-                'max_overflow': 10,
+                'pool_size': 10,
+                'max_overflow': 20,
                 'pool_timeout': 30,
                 'pool_recycle': 1800,
+                'pool_pre_ping': True,
+                # Reuse the most recently returned connection so idle extras can age out
+                'pool_use_lifo': True,
+                'query_cache_size': 1200,
                 'connect_args': {
                     'sslmode': 'require'
                 }
             }
             print("✓ Added PostgreSQL connection pooling and SSL options", file=sys.stderr)
         else:
-            # For SQLite, don't add any engine options
-            SQLALCHEMY_ENGINE_OPTIONS = {}
+            # For SQLite, skip pooling options - only size the compiled-statement cache
+            SQLALCHEMY_ENGINE_OPTIONS = {'query_cache_size': 1200}
 
     print("*******************************************", file=sys.stderr)
     # --- End Database Configuration ---
@@ -85,6 +89,24 @@ class Config:
         UPLOAD_FOLDER = os.path.join(project_root, 'uploads')
         print(f"✓ Using local upload folder: {UPLOAD_FOLDER}", file=sys.stderr)
 
+    # Let the front-end server stream uploaded images (nginx X-Accel-Redirect)
+    # instead of pushing the bytes through Python. Leave off for local dev.
+    USE_XSENDFILE = os.environ.get('USE_XSENDFILE', 'false').lower() == 'true'
+
+    # Register the debug/test routes (file finders, config dumps, test emails).
+    # They are always on under `python app.py`; leave off in production.
+    ENABLE_DEBUG_ROUTES = os.environ.get('ENABLE_DEBUG_ROUTES', 'false').lower() == 'true'
+
+    # Products per page on the /products listing
+    PRODUCTS_PER_PAGE = int(os.environ.get('PRODUCTS_PER_PAGE', 24))
+
+    # Orders per statement/commit in admin bulk status updates (SQLite caps bind params at 999)
+    BULK_UPDATE_BATCH_SIZE = int(os.environ.get('BULK_UPDATE_BATCH_SIZE', 500))
+
+    # Password hashing method for new hashes; existing hashes keep verifying
+    # whatever method they were made with, so this can be tuned at any time
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+
     # Max file size (16MB)
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024
     
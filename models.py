@@ -1,7 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime, timedelta  # Add timedelta here
-from time import time
+from time import time, monotonic
 import random
 import string
 import secrets
@@ -17,6 +17,15 @@ NIGERIA_STATES = [
     'Kebbi', 'Kogi', 'Kwara', 'Lagos', 'Nasarawa', 'Niger', 'Ogun', 'Ondo',
     'Osun', 'Oyo', 'Plateau', 'Rivers', 'Sokoto', 'Taraba', 'Yobe', 'Zamfara'
 ]
+# Same states for membership checks; the list keeps dropdown order
+NIGERIA_STATES_SET = frozenset(NIGERIA_STATES)
+
+# Process-wide snapshot of the Settings row; cleared whenever settings are saved and
+# refreshed after SETTINGS_CACHE_TTL seconds so other workers pick up changes too
+SETTINGS_CACHE_TTL = 60
+_SETTINGS_CACHE = {'obj': None, 'expires': 0}
+# Same for the maintenance row, which every request checks
+_MAINTENANCE_CACHE = {'obj': None, 'expires': 0}
 
 def generate_order_number():
     """Generate a unique order number"""
@@ -54,14 +63,44 @@ class Settings(db.Model):
                 currency='₦',
                 site_name='Captain Signature'
             )
+    
+    @staticmethod
+    def get_cached():
+        """Get a read-only snapshot of the settings, loaded once per process"""
+        cached = _SETTINGS_CACHE['obj']
+        if cached is None or monotonic() >= _SETTINGS_CACHE['expires']:
+            from types import SimpleNamespace
+            settings = Settings.get_settings()
+            cached = SimpleNamespace(
+                delivery_fee=settings.delivery_fee,
+                free_delivery_threshold=settings.free_delivery_threshold,
+                currency=settings.currency,
+                site_name=settings.site_name
+            )
+            # Don't pin the fallback values if the database was unavailable
+            if isinstance(settings, Settings):
+                _SETTINGS_CACHE['obj'] = cached
+                _SETTINGS_CACHE['expires'] = monotonic() + SETTINGS_CACHE_TTL
+        return cached
+    
+    @staticmethod
+    def clear_cache():
+        """Drop the cached snapshot so the next read reloads from the database"""
+        _SETTINGS_CACHE['obj'] = None
+        _SETTINGS_CACHE['expires'] = 0
 
 class User(UserMixin, db.Model):
+    __table_args__ = (
+        # Customer listing: non-admin users, newest first
+        db.Index('ix_user_is_admin_created_at', 'is_admin', 'created_at'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password = db.Column(db.String(200), nullable=False)
     is_admin = db.Column(db.Boolean, default=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     phone = db.Column(db.String(20), nullable=True)
     address = db.Column(db.Text, nullable=True)
     city = db.Column(db.String(100), nullable=True)
@@ -71,23 +110,35 @@ class User(UserMixin, db.Model):
     orders = db.relationship('Order', backref='customer', lazy=True)
 
 class Product(db.Model):
+    __table_args__ = (
+        # Category-filtered listings, paged in id order
+        db.Index('ix_product_category_id', 'category', 'id'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=False)
     price = db.Column(db.Float, nullable=False)
     category = db.Column(db.String(50), nullable=False)
     image = db.Column(db.String(200), nullable=True)
-    stock = db.Column(db.Integer, default=0)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    stock = db.Column(db.Integer, default=0, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
     # Relationships
     order_items = db.relationship('OrderItem', backref='product', lazy=True)
 
 class Order(db.Model):
+    __table_args__ = (
+        # Dashboard pending counts and status-filtered listings, newest first
+        db.Index('ix_order_status_order_date', 'status', 'order_date'),
+        # A customer's own orders, newest first (customer dashboard)
+        db.Index('ix_order_user_id_order_date', 'user_id', 'order_date'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     order_number = db.Column(db.String(50), unique=True, default=generate_order_number)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    order_date = db.Column(db.DateTime, default=datetime.utcnow)
+    order_date = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     status = db.Column(db.String(50), default='pending')  # pending, processing, shipped, delivered, cancelled
     subtotal = db.Column(db.Float, default=0.0)
     delivery_fee = db.Column(db.Float, default=1500.00)
@@ -219,6 +270,35 @@ class MaintenanceSettings(db.Model):
                 allowed_paths=['/static', '/admin/maintenance']
             )
     
+    @staticmethod
+    def get_cached():
+        """Get a read-only snapshot of the maintenance settings, loaded once per process"""
+        cached = _MAINTENANCE_CACHE['obj']
+        if cached is None or monotonic() >= _MAINTENANCE_CACHE['expires']:
+            settings = MaintenanceSettings.get_settings()
+            # The database fallback has no helper methods, so don't snapshot or pin it
+            if not isinstance(settings, MaintenanceSettings):
+                return settings
+            from types import SimpleNamespace
+            allowed_ips = settings.get_allowed_ips_list()
+            allowed_paths = settings.get_allowed_paths_list()
+            cached = SimpleNamespace(
+                enabled=settings.enabled,
+                message=settings.message,
+                estimated_return=settings.estimated_return,
+                get_allowed_ips_list=lambda: list(allowed_ips),
+                get_allowed_paths_list=lambda: list(allowed_paths)
+            )
+            _MAINTENANCE_CACHE['obj'] = cached
+            _MAINTENANCE_CACHE['expires'] = monotonic() + SETTINGS_CACHE_TTL
+        return cached
+    
+    @staticmethod
+    def clear_cache():
+        """Drop the cached snapshot so the next read reloads from the database"""
+        _MAINTENANCE_CACHE['obj'] = None
+        _MAINTENANCE_CACHE['expires'] = 0
+    
     def get_allowed_ips_list(self):
         """Convert comma-separated IPs to list"""
         if not self.allowed_ips:
@@ -1,15 +1,19 @@
 import requests
 import json
 import os
+import hmac
+import hashlib
 from flask import current_app, url_for
-from datetime import datetime
 import secrets
+import time
 
 class Paystack:
     def __init__(self):
         self.secret_key = os.environ.get('PAYSTACK_SECRET_KEY')
         self.public_key = os.environ.get('PAYSTACK_PUBLIC_KEY')
         self.base_url = 'https://api.paystack.co'
+        # One pooled session so repeat calls reuse the open TLS connection
+        self.http = requests.Session()
         
     def initialize_transaction(self, email, amount, reference=None, callback_url=None, metadata=None):
         """
@@ -25,7 +29,7 @@ class Paystack:
         """
         if not reference:
             # Generate a unique reference
-            reference = f"CAPTAIN-{datetime.now().strftime('%Y%m%d%H%M%S')}-{secrets.token_hex(4)}"
+            reference = f"CAPTAIN-{int(time.time())}-{secrets.token_hex(4)}"
         
         # Convert amount to kobo (Paystack uses smallest currency unit)
         amount_in_kobo = int(amount * 100)
@@ -44,7 +48,7 @@ class Paystack:
         }
         
         try:
-            response = requests.post(
+            response = self.http.post(
                 f'{self.base_url}/transaction/initialize',
                 headers=headers,
                 json=data
@@ -68,7 +72,7 @@ class Paystack:
         }
         
         try:
-            response = requests.get(
+            response = self.http.get(
                 f'{self.base_url}/transaction/verify/{reference}',
                 headers=headers
             )
@@ -77,6 +81,22 @@ class Paystack:
             print(f"Paystack verification error: {e}")
             return {'status': False, 'message': str(e)}
     
+    def verify_webhook_signature(self, raw_body, signature):
+        """
+        Check a webhook's x-paystack-signature header
+        Args:
+            raw_body: Request body bytes exactly as received (request.get_data())
+            signature: Value of the x-paystack-signature header
+        Returns:
+            bool: True if the body was signed with our secret key
+        """
+        if not self.secret_key or not signature:
+            return False
+        
+        # HMAC over the raw bytes - no decode/re-encode - compared in constant time
+        expected = hmac.new(self.secret_key.encode(), raw_body, hashlib.sha512).hexdigest()
+        return hmac.compare_digest(expected, signature)
+    
     def list_banks(self, country='nigeria'):
         """
         List available banks
@@ -90,7 +110,7 @@ class Paystack:
         }
         
         try:
-            response = requests.get(
+            response = self.http.get(
                 f'{self.base_url}/bank?country={country}',
                 headers=headers
             )
@@ -104,7 +124,7 @@ class Paystack:
         Charge a previously authorized card (for recurring payments)
         """
         if not reference:
-            reference = f"CAPTAIN-CHARGE-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+            reference = f"CAPTAIN-CHARGE-{int(time.time())}-{secrets.token_hex(4)}"
         
         amount_in_kobo = int(amount * 100)
         
@@ -121,7 +141,7 @@ class Paystack:
         }
         
         try:
-            response = requests.post(
+            response = self.http.post(
                 f'{self.base_url}/transaction/charge_authorization',
                 headers=headers,
                 json=data
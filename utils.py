@@ -1,12 +1,14 @@
 import os
 import secrets
 from flask import current_app
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
+
+# cloudinary (and the urllib3 stack under it) is imported by the functions that
+# use it, so it only loads on the first upload instead of on every cold start
 
 def init_cloudinary():
     """Initialize Cloudinary with app config"""
+    import cloudinary
+    
     cloud_name = os.environ.get('CLOUDINARY_CLOUD_NAME')
     api_key = os.environ.get('CLOUDINARY_API_KEY')
     api_secret = os.environ.get('CLOUDINARY_API_SECRET')
@@ -31,6 +33,8 @@ def save_picture_cloudinary(form_picture):
     Returns: secure URL of uploaded image
     """
     try:
+        import cloudinary.uploader
+        
         # Initialize Cloudinary
         if not init_cloudinary():
             raise Exception("Cloudinary not configured properly")
@@ -160,6 +164,7 @@ def delete_picture_cloudinary(image_url):
     Delete an image from Cloudinary using its URL
     """
     try:
+        import cloudinary.uploader
         if not init_cloudinary():
             return False
         
@@ -188,6 +193,7 @@ def get_image_info_cloudinary(public_id):
     Get information about an image from Cloudinary
     """
     try:
+        import cloudinary.api
         if not init_cloudinary():
             return None
         
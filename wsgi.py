@@ -0,0 +1,20 @@
+# wsgi.py
+# Gunicorn entry point for non-Vercel deployments:
+#   gunicorn -k gevent -w 4 --worker-connections 1000 wsgi:app
+# Patching has to happen before app (and psycopg2) are imported.
+try:
+    from gevent import monkey
+    monkey.patch_all()
+    try:
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    except ImportError:
+        print("⚠ psycogreen not installed - database calls will block the gevent worker")
+except ImportError:
+    # Plain sync workers: gunicorn -w 4 wsgi:app
+    pass
+
+from app import app
+
+if __name__ == '__main__':
+    app.run()